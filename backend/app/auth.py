@@ -1,6 +1,6 @@
 import os
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -10,6 +10,7 @@ from passlib.context import CryptContext
 from .database import get_user_by_username, get_user_by_email
 from .dynamodb_auth import dynamodb_auth
 from .models import TokenData, UserInDB
+from .tracing import traced
 
 # Security configurations (use env vars in real deployments)
 SECRET_KEY = os.getenv("JWT_SECRET", "change-me-in-env")
@@ -22,10 +23,12 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+@traced("bcrypt.verify")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+@traced("bcrypt.hash")
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -64,6 +67,10 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def _decode_token(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,7 +78,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -83,3 +90,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     if user is None:
         raise credentials_exception
     return user
+
+
+def get_user_from_refresh_token(token: str) -> Optional[UserInDB]:
+    """Resolve the user behind a refresh-token cookie, or None if it is invalid."""
+    try:
+        payload = _decode_token(token)
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    if payload.get("typ") != "refresh" or not username:
+        return None
+    return get_user_by_username(username)
+
+
+def is_admin_request(headers: Dict[str, str]) -> bool:
+    """Whether lower-cased request `headers` carry a bearer access token for the admin user.
+
+    Used by middleware, before routing, so it only checks the token and
+    does not load the user.
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = _decode_token(token)
+    except JWTError:
+        return False
+    return payload.get("sub") == "admin" and payload.get("typ") != "refresh"
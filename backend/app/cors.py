@@ -0,0 +1,109 @@
+"""Single-layer CORS handling.
+
+Preflight (`OPTIONS` + `Access-Control-Request-Method`) requests are
+answered directly, without entering the rest of the middleware stack or
+routing. The response headers for each allowed origin are built once at
+startup, and origins are checked with an O(1) set lookup. An
+`Access-Control-Max-Age` header lets browsers cache the preflight result
+instead of repeating it before every authenticated call.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def _vary_with_origin(values: List[bytes]) -> bytes:
+    """Merge existing Vary header values and add Origin unless already listed."""
+    fields = [f.strip() for v in values for f in v.split(b",") if f.strip()]
+    if b"*" not in fields and not any(f.lower() == b"origin" for f in fields):
+        fields.append(b"Origin")
+    return b", ".join(fields)
+
+
+class CORSMiddleware:
+    def __init__(
+        self,
+        app,
+        allow_origins: Iterable[str],
+        allow_methods: Iterable[str] = ("GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"),
+        allow_headers: Iterable[str] = ("Content-Type", "Authorization"),
+        allow_credentials: bool = True,
+        max_age: int = 600,
+    ):
+        self.app = app
+        allow_origins = list(allow_origins)
+        origins = [o for o in allow_origins if o != "*"]
+        self.allow_any_origin = "*" in allow_origins
+        self.allow_origins = frozenset(origins)
+        self._preflight_common: Headers = [
+            (b"access-control-allow-methods", ", ".join(allow_methods).encode()),
+            (b"access-control-allow-headers", ", ".join(allow_headers).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+            (b"content-length", b"0"),
+            (b"vary", b"Origin"),
+        ]
+        self._simple_common: Headers = []
+        if allow_credentials:
+            self._preflight_common.append((b"access-control-allow-credentials", b"true"))
+            self._simple_common.append((b"access-control-allow-credentials", b"true"))
+        # Full header sets per configured origin, precomputed once
+        self._preflight: Dict[str, Headers] = {o: self._preflight_headers(o) for o in origins}
+        self._simple: Dict[str, Headers] = {o: self._simple_headers(o) for o in origins}
+
+    def _preflight_headers(self, origin: str) -> Headers:
+        return [(b"access-control-allow-origin", origin.encode("latin-1"))] + self._preflight_common
+
+    def _simple_headers(self, origin: str) -> Headers:
+        return [(b"access-control-allow-origin", origin.encode("latin-1"))] + self._simple_common
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        preflight = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value.decode("latin-1")
+            elif name == b"access-control-request-method":
+                preflight = True
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed = origin in self.allow_origins or self.allow_any_origin
+        if preflight and scope["method"] == "OPTIONS":
+            if allowed:
+                headers = self._preflight.get(origin) or self._preflight_headers(origin)
+                status = 200
+            else:
+                headers = [(b"content-length", b"0"), (b"vary", b"Origin")]
+                status = 400
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if not allowed:
+            await self.app(scope, receive, send)
+            return
+
+        extra = self._simple.get(origin) or self._simple_headers(origin)
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = []
+                vary = []
+                for k, v in message.get("headers", []):
+                    name = k.lower()
+                    if name == b"vary":
+                        vary.append(v)
+                    elif not name.startswith(b"access-control-allow-"):
+                        headers.append((k, v))
+                headers.extend(extra)
+                # Responses differ per origin, so caches must key on it too
+                headers.append((b"vary", _vary_with_origin(vary)))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
@@ -2,25 +2,66 @@ import os
 import csv
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List
 from .models import UserInDB, FeedbackPublic
+from .feedback_segments import (
+    should_rotate,
+    seal_segment,
+    archive_in_background,
+    archive_pending_segments,
+    scan_feedback,
+)
+from .feedback_stream import FeedbackTailer, feedback_broker
+from .file_lock import exclusive_lock
+from .tracing import traced
+from .user_shards import EmailIndex, shard_dirs_from_env, shard_files, shard_index
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), 'data')
+# Single-shard users file; the only shard when USER_SHARDS is 1
 USERS_FILE = os.path.join(DATA_DIR, 'users.csv')
+USER_SHARD_DIRS = shard_dirs_from_env(DATA_DIR)
+USER_SHARD_FILES = shard_files(USER_SHARD_DIRS)
+USER_EMAIL_INDEX_FILE = os.getenv('USER_EMAIL_INDEX_FILE', os.path.join(DATA_DIR, 'users_email_index.csv'))
 FEEDBACK_FILE = os.path.join(DATA_DIR, 'feedback.csv')
+FEEDBACK_SEGMENTS_DIR = os.path.join(DATA_DIR, 'feedback_segments')
+
+# Rotate the active feedback segment once it reaches either limit (0 disables)
+FEEDBACK_SEGMENT_MAX_BYTES = int(os.getenv('FEEDBACK_SEGMENT_MAX_BYTES', str(64 * 1024 * 1024)))
+FEEDBACK_SEGMENT_MAX_AGE_SECONDS = int(os.getenv('FEEDBACK_SEGMENT_MAX_AGE_SECONDS', str(7 * 24 * 60 * 60)))
 
 USER_FIELDS = ['username', 'email', 'full_name', 'hashed_password', 'disabled', 'avatar', 'onboarding_completed']
 FEEDBACK_FIELDS = ['id', 'username', 'rating', 'message', 'timestamp']
 
+email_index = EmailIndex(USER_EMAIL_INDEX_FILE, USER_SHARD_FILES)
+
+
 
 def _ensure_data_file() -> None:
-    os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
-        with open(USERS_FILE, mode='w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
-            writer.writeheader()
+    for path in USER_SHARD_FILES:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, mode='w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
+                writer.writeheader()
+
+
+def _user_shard_file(username: str) -> str:
+    return USER_SHARD_FILES[shard_index(username, len(USER_SHARD_FILES))]
+
+
+def _row_to_user(row: dict) -> UserInDB:
+    return UserInDB(
+        username=row.get('username', ''),
+        email=row.get('email', ''),
+        full_name=row.get('full_name') or None,
+        hashed_password=row.get('hashed_password', ''),
+        disabled=(str(row.get('disabled', 'False')).lower() == 'true'),
+        avatar=row.get('avatar') or random_avatar(),
+        onboarding_completed=(str(row.get('onboarding_completed', 'False')).lower() == 'true'),
+    )
 
 
 def _ensure_feedback_file() -> None:
@@ -31,42 +72,29 @@ def _ensure_feedback_file() -> None:
             writer.writeheader()
 
 
+@traced('csv.get_user_by_username')
 def get_user_by_username(username: str) -> Optional[UserInDB]:
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
+    path = _user_shard_file(username)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
         return None
-    with open(USERS_FILE, mode='r', newline='') as f:
+    with open(path, mode='r', newline='') as f:
         reader = csv.DictReader(f)
         for row in reader:
             if row.get('username') == username:
-                return UserInDB(
-                    username=row.get('username', ''),
-                    email=row.get('email', ''),
-                    full_name=row.get('full_name') or None,
-                    hashed_password=row.get('hashed_password', ''),
-                    disabled=(str(row.get('disabled', 'False')).lower() == 'true'),
-                    avatar=row.get('avatar') or random_avatar(),
-                    onboarding_completed=(str(row.get('onboarding_completed', 'False')).lower() == 'true'),
-                )
+                return _row_to_user(row)
     return None
 
 
+@traced('csv.get_user_by_email')
 def get_user_by_email(email: str) -> Optional[UserInDB]:
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
+    # The email index names the user, and so the single shard to read
+    username = email_index.lookup(email)
+    if username is None:
         return None
-    with open(USERS_FILE, mode='r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('email') == email:
-                return UserInDB(
-                    username=row.get('username', ''),
-                    email=row.get('email', ''),
-                    full_name=row.get('full_name') or None,
-                    hashed_password=row.get('hashed_password', ''),
-                    disabled=(str(row.get('disabled', 'False')).lower() == 'true'),
-                    avatar=row.get('avatar') or random_avatar(),
-                    onboarding_completed=(str(row.get('onboarding_completed', 'False')).lower() == 'true'),
-                )
-    return None
+    user = get_user_by_username(username)
+    if user is None or user.email != email:
+        return None
+    return user
 
 
 def random_avatar() -> str:
@@ -82,6 +110,7 @@ def random_avatar() -> str:
     return random.choice(avatars)
 
 
+@traced('csv.create_user_row')
 def create_user_row(*, username: str, email: str, full_name: Optional[str], hashed_password: str, disabled: bool = False, avatar: Optional[str] = None, onboarding_completed: bool = False) -> UserInDB:
     _ensure_data_file()
     # Prevent duplicates by username or email
@@ -99,12 +128,14 @@ def create_user_row(*, username: str, email: str, full_name: Optional[str], hash
         'avatar': avatar or random_avatar(),
         'onboarding_completed': 'True' if onboarding_completed else 'False',
     }
-    with open(USERS_FILE, mode='a', newline='') as f:
+    path = _user_shard_file(username)
+    with open(path, mode='a', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
         # If file is empty, DictWriter will not auto-write headers, so ensure file has them
-        if os.path.getsize(USERS_FILE) == 0:
+        if os.path.getsize(path) == 0:
             writer.writeheader()
         writer.writerow(row)
+    email_index.add(email, username)
 
     return UserInDB(
         username=username,
@@ -117,24 +148,26 @@ def create_user_row(*, username: str, email: str, full_name: Optional[str], hash
     )
 
 
-def update_hashed_password(username: str, new_hashed_password: str) -> bool:
-    """Update a user's hashed password in the CSV. Returns True if updated, False if not found."""
+@traced('csv.update_user_fields')
+def _update_user_fields(username: str, changes: dict) -> bool:
+    """Rewrite the user's shard with `changes` applied. Returns True if the user was found."""
     _ensure_data_file()
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
+    path = _user_shard_file(username)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
         return False
 
     updated = False
     rows = []
-    with open(USERS_FILE, mode='r', newline='') as f:
+    with open(path, mode='r', newline='') as f:
         reader = csv.DictReader(f)
         for row in reader:
             if row.get('username') == username:
-                row['hashed_password'] = new_hashed_password
+                row.update(changes)
                 updated = True
             rows.append(row)
 
     if updated:
-        with open(USERS_FILE, mode='w', newline='') as f:
+        with open(path, mode='w', newline='') as f:
             writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
             writer.writeheader()
             writer.writerows(rows)
@@ -142,119 +175,160 @@ def update_hashed_password(username: str, new_hashed_password: str) -> bool:
     return updated
 
 
+def update_hashed_password(username: str, new_hashed_password: str) -> bool:
+    """Update a user's hashed password in the CSV. Returns True if updated, False if not found."""
+    return _update_user_fields(username, {'hashed_password': new_hashed_password})
+
+
 def update_avatar(username: str, new_avatar: str) -> bool:
     """Update user's avatar filename. Returns True on success."""
-    _ensure_data_file()
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
-        return False
-    rows = []
-    updated = False
-    with open(USERS_FILE, mode='r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('username') == username:
-                row['avatar'] = new_avatar
-                updated = True
-            rows.append(row)
-    if updated:
-        with open(USERS_FILE, mode='w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
-            writer.writeheader()
-            writer.writerows(rows)
-    return updated
+    return _update_user_fields(username, {'avatar': new_avatar})
 
 
 def mark_onboarding_completed(username: str) -> bool:
     """Set onboarding_completed to True for given user."""
-    _ensure_data_file()
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
-        return False
-    updated = False
-    rows = []
-    with open(USERS_FILE, mode='r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('username') == username:
-                row['onboarding_completed'] = 'True'
-                updated = True
-            rows.append(row)
-    if updated:
-        with open(USERS_FILE, mode='w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
-            writer.writeheader()
-            writer.writerows(rows)
-    return updated
+    return _update_user_fields(username, {'onboarding_completed': 'True'})
 
 
+@traced('csv.list_all_users')
 def list_all_users():
-    """Return a list of all users as UserInDB objects."""
+    """Return a list of all users (across every shard) as UserInDB objects."""
     _ensure_data_file()
     users = []
-    if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
-        return users
-    with open(USERS_FILE, mode='r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            users.append(
-                UserInDB(
-                    username=row.get('username', ''),
-                    email=row.get('email', ''),
-                    full_name=row.get('full_name') or None,
-                    hashed_password=row.get('hashed_password', ''),
-                    disabled=(str(row.get('disabled', 'False')).lower() == 'true'),
-                    avatar=row.get('avatar') or random_avatar(),
-                    onboarding_completed=(str(row.get('onboarding_completed', 'False')).lower() == 'true'),
-                )
-            )
+    for path in USER_SHARD_FILES:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            continue
+        with open(path, mode='r', newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                users.append(_row_to_user(row))
     return users
 
 def allowed_avatars() -> list:
     """Return the list of allowed DBZ avatar filenames."""
+    return list(_avatar_catalog())
+
+
+@lru_cache(maxsize=1)
+def _avatar_catalog() -> tuple:
+    # The avatar directory ships with the build, so it is listed once per process
     avatar_dir = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), 'public', 'dbz')
     if not os.path.exists(avatar_dir):
-        return []
+        return ()
     
     avatars = [f for f in os.listdir(avatar_dir) if f.endswith('.png')]
-    return sorted(avatars)
+    return tuple(sorted(avatars))
 
 
 # Feedback functions
+def _rotate_feedback_if_needed() -> bool:
+    # Caller holds the feedback file lock; only the cheap rename happens here
+    if should_rotate(FEEDBACK_FILE, FEEDBACK_SEGMENT_MAX_BYTES, FEEDBACK_SEGMENT_MAX_AGE_SECONDS):
+        seal_segment(FEEDBACK_FILE, FEEDBACK_SEGMENTS_DIR)
+        return True
+    return False
+
+
+def archive_sealed_feedback() -> None:
+    """Convert any sealed feedback segments left over (e.g. from a crash) into archives."""
+    archive_pending_segments(FEEDBACK_SEGMENTS_DIR, FEEDBACK_FIELDS)
+
+
+@traced('csv.create_feedback')
 def create_feedback(username: str, rating: int, message: str) -> str:
     """Create a new feedback entry. Returns the feedback ID."""
-    _ensure_feedback_file()
-    
     feedback_id = str(uuid.uuid4())
     timestamp = datetime.now().isoformat()
     
-    with open(FEEDBACK_FILE, mode='a', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=FEEDBACK_FIELDS)
-        writer.writerow({
-            'id': feedback_id,
-            'username': username,
-            'rating': rating,
-            'message': message,
-            'timestamp': timestamp
-        })
+    # Cross-process lock: other workers must not append while the file is sealed
+    with exclusive_lock(FEEDBACK_FILE):
+        rotated = _rotate_feedback_if_needed()
+        _ensure_feedback_file()
+        with open(FEEDBACK_FILE, mode='a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FEEDBACK_FIELDS)
+            writer.writerow({
+                'id': feedback_id,
+                'username': username,
+                'rating': rating,
+                'message': message,
+                'timestamp': timestamp
+            })
+    if rotated:
+        # Converting to columnar format takes seconds; keep it off the request
+        archive_in_background(FEEDBACK_SEGMENTS_DIR, FEEDBACK_FIELDS)
     
     return feedback_id
 
 
+@traced('csv.list_all_feedback')
 def list_all_feedback() -> List[FeedbackPublic]:
-    """Return a list of all feedback entries."""
-    if not os.path.exists(FEEDBACK_FILE) or os.path.getsize(FEEDBACK_FILE) == 0:
-        return []
-    
-    feedback_list = []
-    with open(FEEDBACK_FILE, mode='r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            feedback_list.append(FeedbackPublic(
-                id=row.get('id', ''),
-                username=row.get('username', ''),
-                rating=int(row.get('rating', 0)),
-                message=row.get('message', ''),
-                timestamp=row.get('timestamp', '')
-            ))
+    """Return a list of all feedback entries across every segment."""
+    feedback_list = [
+        FeedbackPublic(
+            id=feedback_id,
+            username=username,
+            rating=rating,
+            message=message,
+            timestamp=timestamp
+        )
+        for feedback_id, username, rating, message, timestamp
+        in scan_feedback(FEEDBACK_SEGMENTS_DIR, FEEDBACK_FILE, FEEDBACK_FIELDS)
+    ]
     
     # Return newest first
     return sorted(feedback_list, key=lambda x: x.timestamp, reverse=True)
+
+
+@traced('csv.list_feedback_after')
+def list_feedback_after(feedback_id: str) -> Optional[List[FeedbackPublic]]:
+    """Return entries written after `feedback_id`, oldest first, or None if the id is unknown."""
+    found = False
+    after = []
+    for row in scan_feedback(FEEDBACK_SEGMENTS_DIR, FEEDBACK_FILE, FEEDBACK_FIELDS):
+        if found:
+            after.append(FeedbackPublic(**dict(zip(FEEDBACK_FIELDS, row))))
+        elif row[0] == feedback_id:
+            found = True
+    return after if found else None
+
+
+def _sealed_feedback_after(feedback_id: Optional[str], since: str) -> List[FeedbackPublic]:
+    """Entries in sealed segments after `feedback_id`, or from `since` on when there is no id."""
+    found = feedback_id is None
+    after = []
+    rows = scan_feedback(FEEDBACK_SEGMENTS_DIR, None, FEEDBACK_FIELDS, since=None if feedback_id else since)
+    for row in rows:
+        if found:
+            after.append(FeedbackPublic(**dict(zip(FEEDBACK_FIELDS, row))))
+        elif row[0] == feedback_id:
+            found = True
+    return after
+
+
+# Follows feedback.csv so every worker streams rows written by any worker
+feedback_tailer = FeedbackTailer(
+    feedback_broker,
+    FEEDBACK_FILE,
+    FEEDBACK_FIELDS,
+    backfill=_sealed_feedback_after,
+    interval=int(os.getenv('FEEDBACK_STREAM_POLL_MS', '200')) / 1000,
+)
+
+
+@traced('csv.feedback_rating_summary')
+def feedback_rating_summary(since: Optional[str] = None, until: Optional[str] = None) -> dict:
+    """Return count, average and per-star distribution of ratings in a time range.
+
+    Only the rating (and, when bounded, timestamp) columns are read, and
+    archived segments outside the range are skipped.
+    """
+    distribution = {star: 0 for star in range(1, 6)}
+    for (rating,) in scan_feedback(FEEDBACK_SEGMENTS_DIR, FEEDBACK_FILE, ['rating'], since, until):
+        distribution[rating] = distribution.get(rating, 0) + 1
+    count = sum(distribution.values())
+    total = sum(star * n for star, n in distribution.items())
+    return {
+        'count': count,
+        'average': round(total / count, 2) if count else None,
+        'distribution': distribution,
+    }
@@ -2,6 +2,7 @@ import boto3
 import os
 from typing import Optional
 from .models import UserInDB
+from .tracing import traced
 from botocore.exceptions import ClientError
 
 class DynamoDBAuth:
@@ -10,6 +11,7 @@ class DynamoDBAuth:
         self.table_name = 'Customers'
         self.table = self.dynamodb.Table(self.table_name)
     
+    @traced('dynamodb.scan')
     def get_user_by_email(self, email: str) -> Optional[UserInDB]:
         """Get user from DynamoDB customers table by email"""
         try:
@@ -0,0 +1,193 @@
+"""Memory-mapped scanner for feedback.csv.
+
+`csv.DictReader` allocates a dict and a string per column for every row,
+which dominates the cost of full scans (admin listing, exports). This
+scanner maps the file instead and works a block at a time: blocks are cut
+on record boundaries with C-level newline and quote searches, then split
+by `csv.reader` (or a plain `str.split` when a block holds no quotes).
+Callers get either lightweight row views or tuples of just the columns
+they need, never a dict per row.
+"""
+import csv
+import io
+import mmap
+import os
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_NL = b'\n'
+_QUOTE = b'"'
+
+# Bytes mapped and decoded per pass; large enough to amortize per-block overhead
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class FeedbackRow:
+    """Read-only view over one feedback record.
+
+    Records from quote-free runs are only split into fields on first
+    access, so a scan that skips rows never pays for splitting them.
+    """
+
+    __slots__ = ('_line', '_columns', '_fields')
+
+    def __init__(self, columns: Dict[str, int], line: str = '', fields: Optional[List[str]] = None):
+        self._line = line
+        self._columns = columns
+        self._fields = fields
+
+    def get(self, name: str, default: str = '') -> str:
+        index = self._columns.get(name)
+        if index is None:
+            return default
+        fields = self._fields
+        if fields is None:
+            fields = self._fields = self._line.split(',')
+        try:
+            return fields[index]
+        except IndexError:
+            return default
+
+    def __getitem__(self, name: str) -> str:
+        if name not in self._columns:
+            raise KeyError(name)
+        return self.get(name)
+
+
+class FeedbackScanner:
+    """Context manager scanning a feedback CSV file through a read-only mmap.
+
+    Iterating yields `FeedbackRow` views; `select()` yields tuples of the
+    named columns. Both hold plain strings, so they remain usable after the
+    scanner is closed.
+    """
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE):
+        self.path = path
+        self.block_size = block_size
+        self._file = None
+        self._buf = None
+        self.columns: Dict[str, int] = {}
+
+    def __enter__(self) -> 'FeedbackScanner':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def open(self) -> None:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        self._file = open(self.path, mode='rb')
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _chunks(self) -> Iterator[bytes]:
+        """Yield runs of complete records, each ending on a record boundary.
+
+        A block is cut at its last newline; if that newline sits inside a
+        quoted field (odd quote count) the block is carried into the next.
+        """
+        buf, block = self._buf, self.block_size
+        size = len(buf)
+        tail = b''
+        for pos in range(0, size, block):
+            chunk = tail + buf[pos:pos + block]
+            if pos + block >= size:
+                tail = b''
+            else:
+                cut = chunk.rfind(_NL) + 1
+                if cut == 0 or chunk.count(_QUOTE, 0, cut) % 2:
+                    tail = chunk
+                    continue
+                chunk, tail = chunk[:cut], chunk[cut:]
+            yield chunk
+        if tail:
+            yield tail
+
+    def _texts(self) -> Iterator[Tuple[str, str]]:
+        """Yield (decoded_chunk, record_terminator) with the header consumed."""
+        columns = self.columns
+        term = None
+        for chunk in self._chunks():
+            text = chunk.decode('utf-8')
+            if term is None:
+                nl = text.find('\n')
+                if nl == -1:
+                    nl = len(text)
+                term = '\r\n' if text[nl - 1:nl] == '\r' else '\n'
+                header = next(csv.reader([text[:nl].rstrip('\r')]), [])
+                columns.update((name, i) for i, name in enumerate(header))
+                text = text[nl + 1:]
+            if text:
+                yield text, term
+
+    def __iter__(self) -> Iterator[FeedbackRow]:
+        if self._buf is None:
+            return
+        columns = self.columns
+        for text, term in self._texts():
+            if '"' in text:
+                # csv.reader copes with quoted commas and newlines at C speed
+                for fields in csv.reader(io.StringIO(text, newline='')):
+                    if fields:
+                        yield FeedbackRow(columns, fields=fields)
+            else:
+                for line in _split_records(text, term):
+                    yield FeedbackRow(columns, line)
+
+    def select(self, *names: str) -> Iterator[tuple]:
+        """Yield a tuple of the named fields for each record.
+
+        Cheaper than row views when the projection is known up front: each
+        chunk is split by `csv.reader` (or plain `str.split` when it holds no
+        quotes) and projected with `itemgetter`, without building a per-row
+        object. Missing fields come back as ''.
+        """
+        if self._buf is None or not names:
+            return
+        getter = None
+        for text, term in self._texts():
+            if getter is None:
+                indexes = [self.columns.get(name) for name in names]
+                if None in indexes:
+                    getter = False
+                elif len(indexes) == 1:
+                    index = indexes[0]
+                    getter = lambda fields: (fields[index],)
+                else:
+                    getter = itemgetter(*indexes)
+            if '"' in text:
+                # csv.reader copes with quoted commas and newlines at C speed
+                rows = csv.reader(io.StringIO(text, newline=''))
+            else:
+                rows = (line.split(',') for line in _split_records(text, term))
+            if getter:
+                try:
+                    yield from [getter(fields) for fields in rows if fields]
+                    continue
+                except IndexError:
+                    # A short record somewhere in the chunk; redo it padded
+                    rows = csv.reader(io.StringIO(text, newline=''))
+            columns = self.columns
+            for fields in rows:
+                if fields:
+                    yield tuple(
+                        fields[columns[name]] if columns.get(name, len(fields)) < len(fields) else ''
+                        for name in names
+                    )
+
+
+def _split_records(text: str, term: str) -> List[str]:
+    records = text.split(term)
+    if '' in records:
+        records = [line for line in records if line]
+    return records
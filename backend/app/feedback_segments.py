@@ -0,0 +1,268 @@
+"""Segmented feedback storage.
+
+New feedback is appended to an active CSV segment (`feedback.csv`). Once
+it grows past a size or age limit it is sealed into the segments
+directory and converted into a compressed columnar archive: a zip file
+with one deflated JSON member per column plus a `meta.json` member that
+records the row count and min/max timestamp. Scans skip archives whose
+timestamp range does not overlap the query and only inflate the columns
+they need; sealed CSVs that are not converted yet and the active segment
+are read through the mmap scanner.
+
+Several worker processes share these files. Appends and sealing hold an
+exclusive lock on the active segment (`file_lock.exclusive_lock`); scans
+take a shared one just long enough to open the active segment and list
+the sealed ones. Converting a sealed segment is slow (seconds at the
+default size limit), so it runs after sealing and outside that lock
+(`archive_pending_segments`). A non-blocking `flock` on the sealed CSV
+ensures that only one process converts it.
+"""
+import csv
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .feedback_reader import FeedbackScanner
+from .file_lock import fcntl, shared_lock
+
+ARCHIVE_SUFFIX = '.fseg'
+SEALED_SUFFIX = '.csv'
+META_MEMBER = 'meta.json'
+INT_COLUMNS = {'rating'}
+
+# Archives are immutable, so their metadata is cached by path
+_meta_cache: Dict[str, dict] = {}
+
+
+def _first_timestamp(path: str) -> Optional[str]:
+    with open(path, mode='r', newline='') as f:
+        row = next(csv.DictReader(f), None)
+    return row.get('timestamp') if row else None
+
+
+def should_rotate(path: str, max_bytes: int, max_age_seconds: int) -> bool:
+    """Return True if the active segment has outgrown its size or age limit."""
+    if not os.path.exists(path):
+        return False
+    if max_bytes and os.path.getsize(path) >= max_bytes:
+        return True
+    if max_age_seconds:
+        first = _first_timestamp(path)
+        if first:
+            try:
+                opened = time.mktime(time.strptime(first[:19], '%Y-%m-%dT%H:%M:%S'))
+            except ValueError:
+                return False
+            return time.time() - opened >= max_age_seconds
+    return False
+
+
+def seal_segment(active_path: str, segment_dir: str) -> str:
+    """Move the active segment into segment_dir and return its new path.
+
+    Names sort by sealing time so archives list in write order. Call it
+    while holding `exclusive_lock(active_path)`, so that no append or scan
+    snapshot is in progress.
+    """
+    os.makedirs(segment_dir, exist_ok=True)
+    stamp = int(time.time() * 1000)
+    # Two seals within one millisecond (or a clock step back) must still
+    # sort after everything sealed before them
+    existing = [name.split('-', 1)[0] for name in os.listdir(segment_dir)]
+    stamps = [int(s) for s in existing if s.isdigit()]
+    if stamps:
+        stamp = max(stamp, max(stamps) + 1)
+    name = f'{stamp:015d}-{uuid.uuid4().hex[:8]}'
+    sealed = os.path.join(segment_dir, name + SEALED_SUFFIX)
+    os.replace(active_path, sealed)
+    return sealed
+
+
+def archive_segment(sealed_path: str, fields: Sequence[str]) -> str:
+    """Convert a sealed CSV segment into a columnar archive and remove the CSV."""
+    columns: Dict[str, list] = {name: [] for name in fields}
+    with FeedbackScanner(sealed_path) as scanner:
+        for row in scanner.select(*fields):
+            for name, value in zip(fields, row):
+                columns[name].append(value)
+    for name in INT_COLUMNS.intersection(columns):
+        columns[name] = [int(value or 0) for value in columns[name]]
+
+    timestamps = columns.get('timestamp') or []
+    meta = {
+        'rows': len(timestamps),
+        'columns': list(fields),
+        'min_timestamp': min(timestamps) if timestamps else None,
+        'max_timestamp': max(timestamps) if timestamps else None,
+    }
+    archive = _archive_path(sealed_path)
+    tmp = f'{archive}.{os.getpid()}.tmp'
+    with zipfile.ZipFile(tmp, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(META_MEMBER, json.dumps(meta))
+        for name, values in columns.items():
+            zf.writestr(name + '.json', json.dumps(values))
+    os.replace(tmp, archive)
+    os.remove(sealed_path)
+    _meta_cache[archive] = meta
+    return archive
+
+
+def _archive_path(sealed_path: str) -> str:
+    return sealed_path[:-len(SEALED_SUFFIX)] + ARCHIVE_SUFFIX
+
+
+def archive_pending_segments(segment_dir: str, fields: Sequence[str]) -> List[str]:
+    """Convert every sealed CSV in segment_dir that no other process is converting."""
+    archived = []
+    for path in list_segments(segment_dir):
+        if not path.endswith(SEALED_SUFFIX):
+            continue
+        try:
+            f = open(path, mode='rb')
+        except FileNotFoundError:
+            continue  # converted by another process meanwhile
+        with f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+            # Another process may have finished it between listing and locking
+            if os.path.exists(path) and not os.path.exists(_archive_path(path)):
+                archived.append(archive_segment(path, fields))
+    return archived
+
+
+def archive_in_background(segment_dir: str, fields: Sequence[str]) -> threading.Thread:
+    thread = threading.Thread(
+        target=archive_pending_segments,
+        args=(segment_dir, fields),
+        name='feedback-archiver',
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def segment_metadata(archive: str) -> dict:
+    meta = _meta_cache.get(archive)
+    if meta is None:
+        with zipfile.ZipFile(archive) as zf:
+            meta = json.loads(zf.read(META_MEMBER))
+        _meta_cache[archive] = meta
+    return meta
+
+
+def read_columns(archive: str, names: Sequence[str]) -> List[list]:
+    """Inflate only the requested columns of an archive."""
+    meta = segment_metadata(archive)
+    with zipfile.ZipFile(archive) as zf:
+        return [
+            json.loads(zf.read(name + '.json')) if name in meta['columns'] else [''] * meta['rows']
+            for name in names
+        ]
+
+
+def list_segments(segment_dir: str) -> List[str]:
+    """Return archives and unconverted sealed CSVs, oldest first."""
+    if not os.path.isdir(segment_dir):
+        return []
+    names = set(os.listdir(segment_dir))
+    return sorted(
+        os.path.join(segment_dir, name)
+        for name in names
+        if name.endswith(ARCHIVE_SUFFIX)
+        # A sealed CSV whose archive was written but not yet removed is a duplicate
+        or (name.endswith(SEALED_SUFFIX) and _archive_path(name) not in names)
+    )
+
+
+def scan_feedback(
+    segment_dir: str,
+    active_path: Optional[str],
+    names: Sequence[str],
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Iterator[tuple]:
+    """Yield tuples of the named columns across all segments, oldest first.
+
+    `since`/`until` are inclusive ISO timestamp bounds. Archives entirely
+    outside the range are skipped using their metadata alone. Columns in
+    INT_COLUMNS come back as ints, everything else as strings. Pass
+    `active_path=None` to read sealed segments only.
+    """
+    names = list(names)
+    filtered = since is not None or until is not None
+    wanted = names + ['timestamp'] if filtered else names
+
+    # Open the active segment and list the sealed ones as one snapshot: a
+    # rotation in between would otherwise drop the segment being sealed
+    active = None
+    if active_path:
+        active = FeedbackScanner(active_path)
+        with shared_lock(active_path):
+            active.open()
+            paths = list_segments(segment_dir) + [active_path]
+    else:
+        paths = list_segments(segment_dir)
+    try:
+        yield from _scan_paths(paths, active_path, active, wanted, names, since, until)
+    finally:
+        if active is not None:
+            active.close()
+
+
+def _scan_paths(
+    paths: List[str],
+    active_path: Optional[str],
+    active: Optional[FeedbackScanner],
+    wanted: List[str],
+    names: List[str],
+    since: Optional[str],
+    until: Optional[str],
+) -> Iterator[tuple]:
+    filtered = since is not None or until is not None
+
+    def in_range(ts: str) -> bool:
+        return (since is None or ts >= since) and (until is None or ts <= until)
+
+    for path in paths:
+        if path != active_path and path.endswith(SEALED_SUFFIX) and not os.path.exists(path):
+            # Converted by the background archiver since it was listed
+            path = _archive_path(path)
+            if not os.path.exists(path):
+                continue
+        if path.endswith(ARCHIVE_SUFFIX):
+            meta = segment_metadata(path)
+            if not meta['rows']:
+                continue
+            if since is not None and meta['max_timestamp'] < since:
+                continue
+            if until is not None and meta['min_timestamp'] > until:
+                continue
+            rows = zip(*read_columns(path, wanted))
+        else:
+            if path == active_path:
+                # Already mapped; it may have been sealed since
+                rows = list(active.select(*wanted))
+            else:
+                with FeedbackScanner(path) as scanner:
+                    rows = list(scanner.select(*wanted))
+            ints = [i for i, name in enumerate(wanted) if name in INT_COLUMNS]
+            if ints and rows:
+                rows = [list(row) for row in rows]
+                for row in rows:
+                    for i in ints:
+                        row[i] = int(row[i] or 0)
+                rows = [tuple(row) for row in rows]
+        if filtered:
+            width = len(names)
+            for row in rows:
+                if in_range(row[width]):
+                    yield row[:width]
+        else:
+            yield from rows
@@ -0,0 +1,215 @@
+"""Pub/sub fanout for new feedback.
+
+Feedback can be written by any worker process, so each process that
+serves `/admin/feedback/stream` runs a `FeedbackTailer`: a thread that
+follows the active feedback segment (including across rotation) and
+publishes every appended row to this process's broker. Each Server-Sent
+Events subscriber (admin dashboards) gets rows pushed instead of
+re-polling the whole feedback listing. Each subscriber has a bounded
+buffer. A subscriber that falls behind is disconnected
+rather than allowed to grow memory without limit; it can reconnect with
+`Last-Event-ID` and resume from the recent-history ring, or from storage
+if its last id has already left the ring.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+from .models import FeedbackPublic
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, buffer_size: int):
+        self.loop = loop
+        self.buffer_size = buffer_size
+        # One slot beyond the buffer is reserved for the overflow sentinel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size + 1)
+        self.overflowed = False
+
+    def _offer(self, event: FeedbackPublic) -> None:
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.buffer_size:
+            # Never evict a buffered event: the client receives everything
+            # queued so far, then resumes after it via Last-Event-ID
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+
+class FeedbackBroker:
+    def __init__(self, buffer_size: int = 256, history_size: int = 1024):
+        self.buffer_size = buffer_size
+        self._history = deque(maxlen=history_size)
+        self._subscribers: List[Subscriber] = []
+        # publish() is called from the tailer thread
+        self._lock = threading.Lock()
+
+    def publish(self, event: FeedbackPublic) -> None:
+        with self._lock:
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone
+                self.unsubscribe(sub)
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def recent_after(self, last_id: str) -> Optional[List[FeedbackPublic]]:
+        """Events published after `last_id`, or None if it is no longer in history."""
+        with self._lock:
+            history = list(self._history)
+        for i, event in enumerate(history):
+            if event.id == last_id:
+                return history[i + 1:]
+        return None
+
+
+class FeedbackTailer:
+    """Publishes rows appended to the active feedback segment by any process.
+
+    The tail starts at the end of the file when `ensure_running()` is first
+    called in a process. When the segment is sealed (renamed away) the
+    still-open handle is drained, and `backfill(last_id, started_at)` is
+    asked for rows in segments sealed since, in case the file rotated more
+    than once between polls. Recently published ids are remembered so a row
+    seen both ways is only published once.
+    """
+
+    def __init__(
+        self,
+        broker: FeedbackBroker,
+        path: str,
+        fields: Sequence[str],
+        backfill: Callable[[Optional[str], str], List[FeedbackPublic]],
+        interval: float,
+        seen_size: int = 4096,
+    ):
+        self.broker = broker
+        self.path = path
+        self.fields = list(fields)
+        self.backfill = backfill
+        self.interval = interval
+        self._seen_order = deque(maxlen=seen_size)
+        self._seen = set()
+        self._last_id: Optional[str] = None
+        self._started_at = ''
+        self._file = None
+        self._pending = ''
+        self._needs_backfill = False
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self) -> None:
+        """Start following the file in this process, if not already doing so."""
+        with self._lock:
+            # Threads do not survive fork; a worker must start its own
+            if self._pid == os.getpid():
+                return
+            self._started_at = datetime.now().isoformat()
+            self._file = None
+            self._pending = ''
+            try:
+                self._file = open(self.path, mode='r', newline='', encoding='utf-8')
+                self._file.seek(0, os.SEEK_END)
+            except FileNotFoundError:
+                # Being rotated; the new file only holds rows written from now on
+                pass
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='feedback-tailer', daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except FileNotFoundError:
+                # The file is briefly missing while a segment is sealed
+                pass
+            except Exception:
+                # Dying here would silently stop every stream in this worker
+                logger.exception("feedback tailer poll failed; retrying")
+
+    def poll(self) -> None:
+        if self._file is None:
+            # Opened before backfilling, so each row is either in a sealed
+            # segment already or still ahead in this file
+            self._file = open(self.path, mode='r', newline='', encoding='utf-8')
+            if self._needs_backfill:
+                self._needs_backfill = False
+                for event in self.backfill(self._last_id, self._started_at):
+                    self._publish(event)
+        self._pending += self._file.read()
+        rotated = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        if rotated:
+            # Sealed under the writers' lock, so the old file is complete
+            self._pending += self._file.read()
+        self._publish_complete_rows()
+        if rotated:
+            self._file.close()
+            self._file = None
+            self._pending = ''
+            self._needs_backfill = True
+
+    def _publish_complete_rows(self) -> None:
+        end = self._pending.rfind('\n') + 1
+        # A quoted message may contain newlines; wait until the quotes balance
+        while end and self._pending.count('"', 0, end) % 2:
+            end = self._pending.rfind('\n', 0, end - 1) + 1
+        if not end:
+            return
+        text, self._pending = self._pending[:end], self._pending[end:]
+        for row in csv.reader(io.StringIO(text, newline='')):
+            if not row or row == self.fields:
+                continue
+            try:
+                event = FeedbackPublic(**dict(zip(self.fields, row)))
+            except ValueError:
+                # e.g. a hand-edited row with a non-numeric rating
+                logger.warning("skipping malformed feedback row: %r", row)
+                continue
+            self._publish(event)
+
+    def _publish(self, event: FeedbackPublic) -> None:
+        if event.id in self._seen:
+            return
+        if len(self._seen_order) == self._seen_order.maxlen:
+            self._seen.discard(self._seen_order[0])
+        self._seen_order.append(event.id)
+        self._seen.add(event.id)
+        self._last_id = event.id
+        self.broker.publish(event)
+
+
+def format_event(event: FeedbackPublic) -> str:
+    return f"id: {event.id}\nevent: feedback\ndata: {event.json()}\n\n"
+
+
+# Fed by the tailer (see database.feedback_tailer), read by the SSE endpoint
+feedback_broker = FeedbackBroker(
+    buffer_size=int(os.getenv("FEEDBACK_STREAM_BUFFER", "256")),
+    history_size=int(os.getenv("FEEDBACK_STREAM_HISTORY", "1024")),
+)
@@ -0,0 +1,56 @@
+"""File locks shared between worker processes.
+
+Under gunicorn or `uvicorn --workers` several processes write the same
+CSV files, so a `threading.Lock` is not enough. `exclusive_lock(path)`
+holds an exclusive `flock` on `<path>.lock` for the duration of the
+block; `shared_lock(path)` holds a shared one, for readers that need a
+consistent view while no writer is active.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Per-path thread locks; they also cover platforms without fcntl
+_thread_locks = {}
+_registry_lock = threading.Lock()
+
+
+@contextmanager
+def exclusive_lock(path: str):
+    """Hold an exclusive cross-process lock associated with `path`."""
+    with _registry_lock:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.lock', mode='a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def shared_lock(path: str):
+    """Hold a shared cross-process lock associated with `path`."""
+    if fcntl is None:
+        with exclusive_lock(path):
+            yield
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # A separate open file description per holder, so flock also
+    # excludes writers in other threads of this process
+    with open(path + '.lock', mode='a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
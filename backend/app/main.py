@@ -1,11 +1,12 @@
 from fastapi import FastAPI, HTTPException, Depends, status, Request, Response
 from starlette.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+import asyncio
 from datetime import timedelta
 from passlib.context import CryptContext
 from .database import (
@@ -19,6 +20,9 @@ from .database import (
     mark_onboarding_completed,
     create_feedback,
     list_all_feedback,
+    feedback_rating_summary,
+    list_feedback_after,
+    feedback_tailer,
 )
 from .models import UserCreate, UserPublic, FeedbackCreate, FeedbackPublic
 from .auth import (
@@ -26,20 +30,41 @@ from .auth import (
     authenticate_user as auth_authenticate_user,
     create_access_token as auth_create_access_token,
     get_current_user as auth_get_current_user,
+    get_user_from_refresh_token,
+    is_admin_request,
     ACCESS_TOKEN_EXPIRE_MINUTES as AUTH_TOKEN_EXPIRE_MINUTES,
     create_refresh_token,
 )
+from .cors import CORSMiddleware
+from .feedback_stream import feedback_broker, format_event
+from .scheduler import SchedulerMiddleware, default_scheduler
+from .tracing import TracingMiddleware, slow_requests
+from .warmup import run_warmup, status as warmup_status
 
 # Initialize FastAPI app
 app = FastAPI(title="Authentication API")
 
+# Admission control: route requests into interactive / bulk / password lanes.
+# Added before CORS so that 503 responses still get CORS headers.
+scheduler = default_scheduler()
+app.add_middleware(SchedulerMiddleware, scheduler=scheduler)
+
+# Span timing and slow-request capture; wraps the scheduler so queue time is included.
+# Only admins may switch on per-request profiling with X-Profile.
+app.add_middleware(
+    TracingMiddleware,
+    is_admin=is_admin_request,
+    # Long-lived event streams would keep a sampler thread busy for their lifetime
+    no_profile_paths=("/admin/feedback/stream",),
+)
+
 # Configure CORS
 """
 CORS configuration
 Uses env var CORS_ORIGINS as a comma-separated list of allowed origins.
 Examples:
   CORS_ORIGINS="https://your-site.netlify.app,https://www.your-site.com"
-If unset, defaults to "*" for development.
+If unset, defaults to the local Vite dev origins; "*" allows any origin.
 """
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "").strip()
 _origins = [o.strip() for o in CORS_ORIGINS.split(",") if o.strip()]
@@ -49,31 +74,23 @@ ALLOWED_ORIGINS = _origins if _origins else [
     "http://127.0.0.1:5174",
 ]
 
+# Browsers may cache a preflight result for this many seconds
+# (Chrome caps it at 7200, Firefox at 86400)
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", "7200"))
+
+# Single CORS layer: preflights are answered here from precomputed headers
+# without reaching the scheduler or routing
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
+    allow_methods=["POST", "GET", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    # Last-Event-ID: sent by EventSource when it reconnects to the feedback stream;
+    # X-Profile: admin opt-in request profiling
+    allow_headers=["Content-Type", "Authorization", "Last-Event-ID", "X-Profile"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    max_age=CORS_MAX_AGE,
 )
 
-# Handle preflight requests
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    response = await call_next(request)
-    if request.method == "OPTIONS":
-        # Mirror the configured CORS origins for preflight responses
-        request_origin = request.headers.get("origin", "")
-        if request_origin in ALLOWED_ORIGINS:
-            response.headers["Access-Control-Allow-Origin"] = request_origin
-        elif ALLOWED_ORIGINS:
-            response.headers["Access-Control-Allow-Origin"] = ALLOWED_ORIGINS[0]
-        response.headers["Access-Control-Allow-Methods"] = "POST, GET, PUT, PATCH, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.status_code = 200
-    return response
-
 # Security configurations
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-prod")  # In production, set via env var
 ALGORITHM = "HS256"
@@ -140,27 +157,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     # Delegate to auth module (keep same dependency signature)
     return await auth_get_current_user(token)
 
-# Seed admin user on startup
+# Seed the admin user and warm caches and crypto backends before accepting
+# traffic (no-op in workers forked from a preloaded master)
 @app.on_event("startup")
-async def seed_admin_user():
-    try:
-        existing = get_user_by_username("admin")
-        if not existing:
-            # Create a default admin user
-            create_user(
-                username="admin",
-                email="admin@example.com",
-                password="admin",
-                full_name="Administrator",
-            )
-    except Exception:
-        # Avoid crashing app on startup if file system not ready; log in real app
-        pass
+async def warm_up():
+    run_warmup()
 
 # Routes
 @app.post("/signup", response_model=UserPublic)
 async def signup(user: UserCreate):
-    user_data = create_user(
+    # bcrypt hashing blocks; run it in the threadpool, not on the event loop
+    user_data = await run_in_threadpool(
+        create_user,
         username=user.username,
         email=user.email,
         password=user.password,
@@ -171,7 +179,7 @@ async def signup(user: UserCreate):
 
 @app.post("/token", response_model=Token)
 async def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await run_in_threadpool(authenticate_user, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -259,12 +267,12 @@ async def complete_onboarding(current_user: UserPublic = Depends(get_current_use
 @app.post("/users/change-password")
 async def change_password(payload: ChangePasswordRequest, current_user: UserPublic = Depends(get_current_user)):
     # Verify current password
-    user_ok = authenticate_user(current_user.username, payload.current_password)
+    user_ok = await run_in_threadpool(authenticate_user, current_user.username, payload.current_password)
     if not user_ok:
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
     # Hash and persist new password
-    new_hashed = get_password_hash(payload.new_password)
+    new_hashed = await run_in_threadpool(get_password_hash, payload.new_password)
     if not update_hashed_password(current_user.username, new_hashed):
         raise HTTPException(status_code=500, detail="Failed to update password")
 
@@ -302,7 +310,8 @@ class AdminCreateUserRequest(BaseModel):
 async def admin_create_user(payload: AdminCreateUserRequest, current_user: UserPublic = Depends(get_current_user)):
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
-    created = create_user(
+    created = await run_in_threadpool(
+        create_user,
         username=payload.username,
         email=payload.email,
         password=payload.password,
@@ -370,11 +379,111 @@ def admin_list_feedback(current_user: UserPublic = Depends(get_current_user)):
     
     return list_all_feedback()
 
+
+@app.get("/admin/feedback/summary", response_model=dict)
+def admin_feedback_summary(since: Optional[str] = None, until: Optional[str] = None, current_user: UserPublic = Depends(get_current_user)):
+    """Admin-only: rating count, average and distribution, optionally within an ISO timestamp range."""
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return feedback_rating_summary(since=since, until=until)
+
+# Seconds between SSE keep-alive comments on an idle feedback stream
+FEEDBACK_STREAM_HEARTBEAT = int(os.getenv("FEEDBACK_STREAM_HEARTBEAT", "15"))
+
+stream_token_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+@app.get("/admin/feedback/stream")
+async def admin_feedback_stream(
+    request: Request,
+    last_event_id: Optional[str] = None,
+    header_token: Optional[str] = Depends(stream_token_scheme),
+):
+    """Admin-only: push new feedback as Server-Sent Events.
+
+    EventSource cannot send an Authorization header, so browsers authenticate
+    with the refresh-token cookie (`withCredentials: true`). Tokens are never
+    accepted in the query string, where access logs would record them.
+    Resume with the `Last-Event-ID` header (sent automatically by EventSource
+    on reconnect) or `?last_event_id=`.
+    """
+    if header_token:
+        current_user = await auth_get_current_user(header_token)
+    else:
+        current_user = get_user_from_refresh_token(request.cookies.get("refresh_token", ""))
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    last_id = request.headers.get("last-event-id") or last_event_id
+
+    async def events():
+        # Tail and subscribe before replaying so nothing written meanwhile is missed
+        feedback_tailer.ensure_running()
+        sub = feedback_broker.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            replayed = set()
+            if last_id:
+                backlog = feedback_broker.recent_after(last_id)
+                if backlog is None:
+                    backlog = await run_in_threadpool(list_feedback_after, last_id) or []
+                for event in backlog:
+                    replayed.add(event.id)
+                    yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=FEEDBACK_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Buffer overflowed: drop this slow consumer; it resumes via Last-Event-ID
+                    yield "event: overflow\ndata: {}\n\n"
+                    break
+                if event.id not in replayed:
+                    yield format_event(event)
+        finally:
+            feedback_broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Admin-only: recent slow (and profiled) requests, newest first
+@app.get("/admin/debug/slow-requests", response_model=List[dict])
+async def admin_slow_requests(limit: int = 50, min_ms: float = 0, path: Optional[str] = None, current_user: UserPublic = Depends(get_current_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    records = [
+        r for r in reversed(slow_requests)
+        if r["duration_ms"] >= min_ms and (path is None or r["path"].startswith(path))
+    ]
+    return records[:limit]
+
+# Admin-only: per-lane admission and queue-time metrics
+@app.get("/admin/scheduler", response_model=dict)
+async def admin_scheduler_metrics(current_user: UserPublic = Depends(get_current_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return scheduler.metrics()
+
 # Health check endpoint
 @app.get("/")
 def root():
     return {"message": "Authentication API is running"}
 
+# Readiness: 200 once warm-up has finished, with per-step timings
+@app.get("/ready")
+async def readiness():
+    return JSONResponse(status_code=200 if warmup_status["ready"] else 503, content=warmup_status)
+
 # Static files: serve avatar images from the repo's public/dbz directory
 try:
     import os as _os
@@ -0,0 +1,193 @@
+"""Admission control for HTTP requests.
+
+Every route shares one event loop and one threadpool, so a burst of large
+CSV reads (admin listings, feedback) or bcrypt hashing can starve cheap,
+latency-sensitive calls like `/users/me/` and `/refresh`. The scheduler
+sorts each request into a lane; a lane admits at most `max_concurrency`
+requests at once, queues up to `max_queue` more, and sheds any request
+that has waited longer than `queue_timeout` seconds with a 503.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .tracing import record_span
+
+
+class LaneRejected(Exception):
+    """Raised when a lane cannot admit a request (queue full or deadline passed)."""
+
+    def __init__(self, lane: str, reason: str):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.reason = reason
+
+
+class Lane:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.shed = 0
+        # Recent queue times in seconds, for percentiles in metrics; shed
+        # requests are kept apart so their deadline-length waits stay visible
+        self._queue_times = deque(maxlen=1024)
+        self._shed_wait_times = deque(maxlen=1024)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the time spent queued, in seconds."""
+        if self._semaphore is None:
+            # Created lazily so it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise LaneRejected(self.name, "queue is full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                self._shed_wait_times.append(time.perf_counter() - started)
+                raise LaneRejected(self.name, "queue deadline exceeded")
+            finally:
+                self.queued -= 1
+        else:
+            # Free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+        waited = time.perf_counter() - started
+        self.active += 1
+        self.admitted += 1
+        self._queue_times.append(waited)
+        return waited
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": int(self.queue_timeout * 1000),
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "queue_time_ms": _percentiles(self._queue_times),
+            "shed_wait_ms": _percentiles(self._shed_wait_times),
+        }
+
+
+def _percentiles(times: Iterable[float]) -> dict:
+    samples = sorted(times)
+
+    def pct(p: float) -> float:
+        if not samples:
+            return 0.0
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+    return {
+        "avg": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "max": pct(1.0),
+    }
+
+
+# (lane, methods or None for any, path prefixes); first match wins
+Route = Tuple[str, Optional[Iterable[str]], Tuple[str, ...]]
+
+
+class Scheduler:
+    def __init__(self, lanes: List[Lane], routes: List[Route], default_lane: str):
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self.routes = [(lane, set(methods) if methods else None, prefixes) for lane, methods, prefixes in routes]
+        self.default_lane = default_lane
+
+    def lane_for(self, method: str, path: str) -> Lane:
+        for lane, methods, prefixes in self.routes:
+            if (methods is None or method in methods) and path.startswith(prefixes):
+                return self.lanes[lane]
+        return self.lanes[self.default_lane]
+
+    def metrics(self) -> dict:
+        return {name: lane.metrics() for name, lane in self.lanes.items()}
+
+
+def _lane_from_env(name: str, concurrency: int, queue: int, timeout_ms: int) -> Lane:
+    prefix = f"LANE_{name.upper()}_"
+    return Lane(
+        name,
+        max_concurrency=int(os.getenv(prefix + "CONCURRENCY", str(concurrency))),
+        max_queue=int(os.getenv(prefix + "QUEUE", str(queue))),
+        queue_timeout=int(os.getenv(prefix + "QUEUE_TIMEOUT_MS", str(timeout_ms))) / 1000,
+    )
+
+
+def default_scheduler() -> Scheduler:
+    """Lanes for this API; limits can be overridden with LANE_<NAME>_* env vars."""
+    return Scheduler(
+        lanes=[
+            _lane_from_env("interactive", 64, 256, 2000),
+            _lane_from_env("bulk", 4, 32, 10000),
+            # bcrypt runs ~100ms of CPU per call in the threadpool; cap it so it
+            # cannot occupy every worker thread
+            _lane_from_env("password", 4, 64, 5000),
+            # Long-lived SSE connections: a hard cap on subscribers, no queueing
+            _lane_from_env("stream", 32, 0, 0),
+        ],
+        routes=[
+            ("stream", {"GET"}, ("/admin/feedback/stream",)),
+            # Cheap admin diagnostics must stay reachable while bulk is saturated
+            ("interactive", None, ("/admin/scheduler", "/admin/debug/")),
+            ("password", {"POST"}, ("/token", "/signup", "/users/change-password", "/admin/users")),
+            ("bulk", None, ("/admin/", "/feedback")),
+        ],
+        default_lane="interactive",
+    )
+
+
+class SchedulerMiddleware:
+    """ASGI middleware admitting HTTP requests through their scheduler lane."""
+
+    def __init__(self, app, scheduler: Scheduler):
+        self.app = app
+        self.scheduler = scheduler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        lane = self.scheduler.lane_for(scope["method"], scope["path"])
+        try:
+            waited = await lane.acquire()
+        except LaneRejected as e:
+            body = json.dumps({"detail": f"Server busy: {e}"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        record_span(f"scheduler.queue.{lane.name}", waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
@@ -0,0 +1,235 @@
+"""Per-request span timing, opt-in sampling profiler and slow-request log.
+
+Every request carries a lightweight trace in a context variable (copied
+into threadpool workers by Starlette). Functions decorated with
+`@traced(...)` add their wall time to it: CSV scans in `database`,
+bcrypt in `auth`, the DynamoDB scan. Requests slower than
+`SLOW_REQUEST_MS` are logged with their span breakdown and kept in a
+bounded ring buffer served at `/admin/debug/slow-requests`.
+
+A request can additionally be profiled, either by an admin sending
+`X-Profile: 1` or by random sampling (`PROFILE_SAMPLE_RATE`). A
+background thread then snapshots the stacks of the threads that served
+the request every `PROFILE_INTERVAL_MS` and reports the hottest ones.
+Sampling stops after `PROFILE_MAX_SAMPLES` rounds, so a long request
+cannot keep the sampler running indefinitely.
+Stacks are sampled per thread, so work for concurrent requests on the
+event-loop thread can show up in the same profile.
+"""
+import contextvars
+import functools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "200"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "2000"))
+PROFILE_TOP_STACKS = 20
+PROFILE_STACK_DEPTH = 30
+
+
+class Trace:
+    def __init__(self, method: str, path: str, profiled: bool):
+        self.method = method
+        self.path = path
+        self.profiled = profiled
+        self.started_at = time.time()
+        # name -> [total seconds, calls]
+        self.spans: Dict[str, List[float]] = {}
+        # Spans can nest (create_user_row -> get_user_by_username); only
+        # outermost ones count towards the attributed total
+        self.depth = 0
+        self.attributed = 0.0
+        self.threads = {threading.get_ident()}
+        self.samples: Counter = Counter()
+        self.truncated = False
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float, outermost: bool = True) -> None:
+        with self._lock:
+            span = self.spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+            if outermost:
+                self.attributed += seconds
+
+    def to_dict(self, status: int, duration: float) -> dict:
+        spans = sorted(self.spans.items(), key=lambda item: item[1][0], reverse=True)
+        attributed = self.attributed
+        result = {
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "started_at": self.started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "spans": [
+                {"name": name, "ms": round(total * 1000, 3), "calls": calls}
+                for name, (total, calls) in spans
+            ],
+            # Routing, validation, the handler body and response serialization
+            "unattributed_ms": round(max(duration - attributed, 0.0) * 1000, 3),
+        }
+        if self.profiled:
+            total = sum(self.samples.values())
+            result["profile"] = {
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": total,
+                "truncated": self.truncated,
+                "top_stacks": [
+                    {"stack": stack, "samples": n, "pct": round(n * 100 / total, 1)}
+                    for stack, n in self.samples.most_common(PROFILE_TOP_STACKS)
+                ],
+            }
+        return result
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+# Most recent slow or profiled requests, newest last
+slow_requests = deque(maxlen=SLOW_REQUEST_BUFFER)
+
+
+def traced(name: str) -> Callable:
+    """Decorator adding the wrapped function's wall time to the current request's trace."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            if trace.profiled:
+                trace.threads.add(threading.get_ident())
+            trace.depth += 1
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                trace.depth -= 1
+                trace.add_span(name, time.perf_counter() - started, outermost=trace.depth == 0)
+        return wrapper
+    return decorator
+
+
+def record_span(name: str, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(name, seconds)
+
+
+def _format_stack(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < PROFILE_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of a trace's threads until stopped or PROFILE_MAX_SAMPLES is reached."""
+
+    def __init__(self, trace: Trace):
+        super().__init__(name="request-profiler", daemon=True)
+        self.trace = trace
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        interval = PROFILE_INTERVAL_MS / 1000
+        own = threading.get_ident()
+        rounds = 0
+        while not self._stop_event.wait(interval):
+            if rounds >= PROFILE_MAX_SAMPLES:
+                self.trace.truncated = True
+                return
+            rounds += 1
+            frames = sys._current_frames()
+            for ident in list(self.trace.threads):
+                frame = frames.get(ident)
+                if frame is not None and ident != own:
+                    self.trace.samples[_format_stack(frame)] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class TracingMiddleware:
+    """ASGI middleware that traces each HTTP request and records slow or profiled ones.
+
+    `is_admin` receives the request headers and decides whether an
+    `X-Profile: 1` header may turn on profiling. Requests under
+    `no_profile_paths` are traced but never profiled.
+    """
+
+    def __init__(
+        self,
+        app,
+        is_admin: Callable[[Dict[str, str]], bool],
+        no_profile_paths: Tuple[str, ...] = (),
+    ):
+        self.app = app
+        self.is_admin = is_admin
+        self.no_profile_paths = tuple(no_profile_paths)
+
+    def _wants_profile(self, path: str, headers: Dict[str, str]) -> bool:
+        if self.no_profile_paths and path.startswith(self.no_profile_paths):
+            return False
+        if headers.get("x-profile") == "1" and self.is_admin(headers):
+            return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        trace = Trace(scope["method"], scope["path"], self._wants_profile(scope["path"], headers))
+        token = _current.set(trace)
+        sampler = None
+        if trace.profiled:
+            sampler = _Sampler(trace)
+            sampler.start()
+        status = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    k.lower() == b"content-type" and v.startswith(b"text/event-stream")
+                    for k, v in message.get("headers", [])
+                )
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            if sampler is not None:
+                sampler.stop()
+            _current.reset(token)
+            # Event streams are long-lived by design, not slow
+            slow = duration * 1000 >= SLOW_REQUEST_MS and not streaming
+            if trace.profiled or slow:
+                record = trace.to_dict(status, duration)
+                slow_requests.append(record)
+                if slow:
+                    logger.warning(
+                        "slow request %s %s %.1fms: %s",
+                        trace.method,
+                        trace.path,
+                        record["duration_ms"],
+                        ", ".join(f"{s['name']}={s['ms']}ms" for s in record["spans"]) or "no spans",
+                    )
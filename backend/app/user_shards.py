@@ -0,0 +1,133 @@
+"""Hash-sharded user storage layout.
+
+Users are partitioned across N shard directories by a stable hash of the
+username, each holding its own `users.csv`, so lookups and updates touch
+a single (N times smaller) file and shards can live on separate volumes.
+A secondary `email -> username` index resolves email lookups to the right
+shard without scanning every one.
+
+Configuration:
+  USER_SHARD_DIRS   comma-separated shard directories (order matters)
+  USER_SHARDS       number of shards under data/user_shards/ when
+                    USER_SHARD_DIRS is unset; 1 (default) keeps the
+                    original single data/users.csv
+  USER_EMAIL_INDEX_FILE  path of the email index CSV
+
+Changing the shard count requires moving rows: see scripts/reshard_users.py.
+"""
+import csv
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .file_lock import exclusive_lock
+
+USERS_FILENAME = 'users.csv'
+INDEX_FIELDS = ['email', 'username']
+
+
+def shard_index(username: str, shard_count: int) -> int:
+    """Stable shard number for a username (Python's hash() is salted per process)."""
+    digest = hashlib.blake2b(username.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+
+def shard_dirs_from_env(data_dir: str) -> List[str]:
+    configured = [d.strip() for d in os.getenv('USER_SHARD_DIRS', '').split(',') if d.strip()]
+    if configured:
+        return configured
+    count = int(os.getenv('USER_SHARDS', '1'))
+    if count <= 1:
+        return [data_dir]
+    return [os.path.join(data_dir, 'user_shards', f'{i:02d}') for i in range(count)]
+
+
+def shard_files(shard_dirs: Iterable[str]) -> List[str]:
+    return [os.path.join(d, USERS_FILENAME) for d in shard_dirs]
+
+
+class EmailIndex:
+    """`email -> username` index persisted as an append-only CSV.
+
+    Held in memory and reloaded when the file changes on disk (e.g. another
+    worker appended to it). If the file does not exist yet it is built by
+    scanning every shard, which also migrates pre-sharding data.
+    """
+
+    def __init__(self, path: str, shard_paths: List[str]):
+        self.path = path
+        self.shard_paths = shard_paths
+        self._entries: Dict[str, str] = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> None:
+        if self._file_stamp() is None:
+            self.rebuild(only_if_missing=True)
+        self._read_if_changed()
+
+    def _read_if_changed(self) -> None:
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return
+        entries = {}
+        with open(self.path, mode='r', newline='') as f:
+            for row in csv.DictReader(f):
+                entries[row.get('email', '')] = row.get('username', '')
+        self._entries = entries
+        self._stamp = stamp
+
+    def rebuild(self, only_if_missing: bool = False) -> None:
+        """Rewrite the index from the shard files.
+
+        Runs under the index's file lock, so concurrent rebuilds and appends
+        from other workers neither collide nor get lost.
+        """
+        with exclusive_lock(self.path):
+            if only_if_missing and self._file_stamp() is not None:
+                # Another worker built it while we waited
+                return
+            entries = {}
+            for path in self.shard_paths:
+                if not os.path.exists(path) or os.path.getsize(path) == 0:
+                    continue
+                with open(path, mode='r', newline='') as f:
+                    for row in csv.DictReader(f):
+                        entries[row.get('email', '')] = row.get('username', '')
+            write_index(self.path, entries)
+            self._entries = entries
+            self._stamp = self._file_stamp()
+
+    def lookup(self, email: str) -> Optional[str]:
+        with self._lock:
+            self._load()
+            return self._entries.get(email)
+
+    def add(self, email: str, username: str) -> None:
+        with self._lock:
+            self._load()
+            with exclusive_lock(self.path):
+                # Pick up other workers' appends before recording our stamp
+                self._read_if_changed()
+                with open(self.path, mode='a', newline='') as f:
+                    csv.writer(f).writerow([email, username])
+                self._entries[email] = username
+                self._stamp = self._file_stamp()
+
+
+def write_index(path: str, entries: Dict[str, str]) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(INDEX_FIELDS)
+        writer.writerows(entries.items())
+    os.replace(tmp, path)
@@ -0,0 +1,129 @@
+"""Startup warm-up.
+
+Without it, every worker builds its state lazily, so the first requests
+after a deploy pay for file creation, cold page cache, passlib's bcrypt
+backend selection and the first JWT round trip. `run_warmup()` does that
+work up front and also seeds the default admin account. It runs from
+the app's startup hook, before uvicorn accepts traffic. Under gunicorn with `preload_app` (see
+`gunicorn.conf.py`), it runs once in the master so forked workers share
+the warmed state copy-on-write.
+"""
+import time
+from typing import Callable, Dict, List, Tuple
+
+from .auth import ALGORITHM, SECRET_KEY, get_password_hash, pwd_context
+from .database import (
+    FEEDBACK_FILE,
+    FEEDBACK_SEGMENTS_DIR,
+    USERS_FILE,
+    _ensure_data_file,
+    _ensure_feedback_file,
+    allowed_avatars,
+    archive_sealed_feedback,
+    create_user_row,
+    email_index,
+    get_user_by_username,
+    list_all_users,
+)
+from .feedback_segments import ARCHIVE_SUFFIX, list_segments, segment_metadata
+from .file_lock import exclusive_lock
+
+# Reported by the readiness endpoint
+status: Dict = {
+    "ready": False,
+    "preloaded": False,
+    "started_at": None,
+    "duration_ms": None,
+    "steps": {},
+    "errors": {},
+}
+
+
+def _warm_data_files() -> None:
+    _ensure_data_file()
+    _ensure_feedback_file()
+
+
+def _seed_admin() -> None:
+    # Workers that warm up on their own (no preload) run this concurrently;
+    # the lock keeps them from each appending an admin row
+    with exclusive_lock(USERS_FILE):
+        if get_user_by_username("admin") is None:
+            create_user_row(
+                username="admin",
+                email="admin@example.com",
+                full_name="Administrator",
+                hashed_password=get_password_hash("admin"),
+            )
+
+
+def _warm_users() -> None:
+    # Pulls the user shards into the page cache and exercises the CSV parse path
+    list_all_users()
+
+
+def _warm_email_index() -> None:
+    email_index.lookup('')
+
+
+def _warm_avatars() -> None:
+    allowed_avatars()
+
+
+def _warm_feedback_segments() -> None:
+    # Segments sealed just before a restart may not have been converted yet
+    archive_sealed_feedback()
+    for path in list_segments(FEEDBACK_SEGMENTS_DIR):
+        if path.endswith(ARCHIVE_SUFFIX):
+            segment_metadata(path)
+    # The active segment is scanned on every listing; fault it in now
+    with open(FEEDBACK_FILE, mode='rb') as f:
+        while f.read(1024 * 1024):
+            pass
+
+
+def _warm_crypto() -> None:
+    # passlib picks and self-tests the bcrypt backend on first use
+    pwd_context.handler("bcrypt").get_backend()
+
+
+def _warm_jwt() -> None:
+    from jose import jwt
+    token = jwt.encode({"sub": "warmup"}, SECRET_KEY, algorithm=ALGORITHM)
+    jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("data_files", _warm_data_files),
+    ("seed_admin", _seed_admin),
+    ("users", _warm_users),
+    ("email_index", _warm_email_index),
+    ("avatars", _warm_avatars),
+    ("feedback_segments", _warm_feedback_segments),
+    ("crypto", _warm_crypto),
+    ("jwt", _warm_jwt),
+]
+
+
+def run_warmup(preload: bool = False) -> Dict:
+    """Run every warm-up step once per process tree and return `status`.
+
+    A worker forked from a preloaded master inherits `status` with
+    `ready` already set, so calling this again is a no-op there.
+    """
+    if status["ready"]:
+        return status
+    started = time.perf_counter()
+    status["started_at"] = time.time()
+    for name, step in WARMUP_STEPS:
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            # A failed step only means that piece stays lazy; never block startup
+            status["errors"][name] = str(e)
+        status["steps"][name] = round((time.perf_counter() - step_started) * 1000, 3)
+    status["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    status["preloaded"] = preload
+    status["ready"] = True
+    return status
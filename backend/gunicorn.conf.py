@@ -0,0 +1,27 @@
+"""Gunicorn config for running the API with pre-forked uvicorn workers.
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported and warmed up once in the master process, and
+workers are forked from it afterwards. Warmed state (avatar catalog,
+segment metadata, passlib/jose backends) is then shared copy-on-write
+instead of being rebuilt in every worker.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server):
+    from app.warmup import run_warmup
+
+    result = run_warmup(preload=True)
+    server.log.info("warm-up finished in %sms", result["duration_ms"])
+    # Move everything allocated so far out of the GC's tracked generations so
+    # collections in workers don't touch (and un-share) those pages
+    gc.freeze()
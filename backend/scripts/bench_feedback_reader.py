@@ -0,0 +1,103 @@
+"""Compare the mmap feedback scanner against csv.DictReader.
+
+Usage (from the backend directory):
+    python scripts/bench_feedback_reader.py --size-mb 2048
+    python scripts/bench_feedback_reader.py --file data/feedback.csv
+
+Without --file a synthetic feedback CSV of roughly --size-mb megabytes is
+generated in a temporary directory (and removed afterwards).
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import FEEDBACK_FIELDS  # noqa: E402
+from app.feedback_reader import FeedbackScanner  # noqa: E402
+
+
+def generate(path: str, size_mb: int) -> int:
+    target = size_mb * 1024 * 1024
+    start = datetime(2024, 1, 1)
+    rows = 0
+    with open(path, mode='w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FEEDBACK_FIELDS)
+        writer.writeheader()
+        while f.tell() < target:
+            for _ in range(10000):
+                message = 'Great app, would use again' if rows % 50 else 'Needs work, "really", on\nmobile'
+                writer.writerow({
+                    'id': str(uuid.uuid4()),
+                    'username': f'user{rows % 5000}',
+                    'rating': rows % 5 + 1,
+                    'message': message,
+                    'timestamp': (start + timedelta(seconds=rows)).isoformat(),
+                })
+                rows += 1
+    return rows
+
+
+def bench_dictreader(path: str, fields) -> float:
+    began = time.perf_counter()
+    with open(path, mode='r', newline='') as f:
+        for row in csv.DictReader(f):
+            for name in fields:
+                row.get(name)
+    return time.perf_counter() - began
+
+
+def bench_scanner(path: str, fields) -> float:
+    began = time.perf_counter()
+    with FeedbackScanner(path) as scanner:
+        for row in scanner:
+            for name in fields:
+                row.get(name)
+    return time.perf_counter() - began
+
+
+def bench_select(path: str, fields) -> float:
+    began = time.perf_counter()
+    with FeedbackScanner(path) as scanner:
+        for _ in scanner.select(*fields):
+            pass
+    return time.perf_counter() - began
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file', help='existing feedback CSV to scan')
+    parser.add_argument('--size-mb', type=int, default=256, help='size of the generated file')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per reader; the best is reported')
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.file
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, 'feedback.csv')
+        print(f'generating ~{args.size_mb} MB of feedback...')
+        print(f'{generate(path, args.size_mb)} rows written')
+
+    try:
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f'{size_mb:.0f} MB, best of {args.repeat} runs')
+        for fields in (['rating'], ['rating', 'timestamp'], FEEDBACK_FIELDS):
+            base = min(bench_dictreader(path, fields) for _ in range(args.repeat))
+            views = min(bench_scanner(path, fields) for _ in range(args.repeat))
+            select = min(bench_select(path, fields) for _ in range(args.repeat))
+            print(f'  {",".join(fields)}')
+            for label, took in (('DictReader', base), ('mmap row views', views), ('mmap select', select)):
+                print(f'    {label:<16} {took:7.2f}s {size_mb / took:8.1f} MB/s  x{base / took:.2f}')
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Offline tool to move users between shard layouts.
+
+Stop the API (or make it read-only) first, then run from the backend
+directory:
+
+    # single data/users.csv -> 4 shards under data/user_shards/
+    python scripts/reshard_users.py --from data --to-count 4
+
+    # explicit directories, e.g. to try several shards on one machine
+    python scripts/reshard_users.py --from data --to /tmp/s0 /tmp/s1 /tmp/s2
+
+Afterwards point the app at the new layout with USER_SHARD_DIRS (or
+USER_SHARDS) and keep USER_EMAIL_INDEX_FILE at the index written here.
+"""
+import argparse
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import DATA_DIR, USER_FIELDS  # noqa: E402
+from app.user_shards import shard_files, shard_index, write_index  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from', dest='source', nargs='+', required=True, help='current shard directories, in order')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--to', nargs='+', help='new shard directories, in order')
+    target.add_argument('--to-count', type=int, help='number of shards to create under data/user_shards/')
+    parser.add_argument('--index', default=os.path.join(DATA_DIR, 'users_email_index.csv'), help='email index file to write')
+    parser.add_argument('--force', action='store_true', help='overwrite existing destination shard files')
+    args = parser.parse_args()
+
+    targets = args.to or [os.path.join(DATA_DIR, 'user_shards', f'{i:02d}') for i in range(args.to_count)]
+    target_files = shard_files(targets)
+    source_files = [os.path.abspath(p) for p in shard_files(args.source)]
+    if not args.force:
+        for path in target_files:
+            if os.path.abspath(path) not in source_files and os.path.exists(path) and os.path.getsize(path) > 0:
+                sys.exit(f'{path} already exists; pass --force to overwrite')
+
+    # Read everything first so sources that are also destinations are safe to rewrite
+    shards = [[] for _ in target_files]
+    emails = {}
+    for path in source_files:
+        if not os.path.exists(path):
+            continue
+        with open(path, mode='r', newline='') as f:
+            for row in csv.DictReader(f):
+                shards[shard_index(row['username'], len(target_files))].append(row)
+                emails[row['email']] = row['username']
+
+    for path, rows in zip(target_files, shards):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=USER_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp, path)
+        print(f'{path}: {len(rows)} users')
+
+    # Sources that are not part of the new layout would otherwise keep stale copies
+    for path in source_files:
+        if path not in [os.path.abspath(p) for p in target_files] and os.path.exists(path):
+            os.replace(path, path + '.resharded')
+            print(f'{path} moved to {path}.resharded')
+
+    write_index(args.index, emails)
+    print(f'{args.index}: {len(emails)} emails')
+
+
+if __name__ == '__main__':
+    main()
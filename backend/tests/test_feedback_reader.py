@@ -0,0 +1,67 @@
+import csv
+import random
+
+import pytest
+
+from app.feedback_reader import FeedbackScanner
+
+FIELDS = ['id', 'username', 'rating', 'message', 'timestamp']
+MESSAGES = [
+    'plain',
+    'has, comma',
+    'quote "x"',
+    'multi\nline',
+    'crlf\r\nline',
+    '',
+    'ünïcode, "q"\nz',
+    'a""b',
+]
+
+
+def _write(path, rows, lineterminator):
+    with open(path, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator=lineterminator)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _expected(path):
+    with open(path, mode='r', newline='', encoding='utf-8') as f:
+        return [tuple(row[k] for k in FIELDS) for row in csv.DictReader(f)]
+
+
+@pytest.mark.parametrize('lineterminator', ['\r\n', '\n'])
+@pytest.mark.parametrize('block_size', [7, 64, 1000, 1 << 22])
+def test_scanner_matches_dictreader(tmp_path, lineterminator, block_size):
+    rng = random.Random(block_size)
+    for trial in range(10):
+        path = tmp_path / f'feedback-{trial}.csv'
+        rows = [
+            {
+                'id': str(i),
+                'username': f'u{i}',
+                'rating': i % 5 + 1,
+                'message': rng.choice(MESSAGES),
+                'timestamp': f'2024-01-01T00:00:{i:05d}',
+            }
+            for i in range(rng.randint(0, 300))
+        ]
+        _write(path, rows, lineterminator)
+        expected = _expected(path)
+
+        with FeedbackScanner(str(path), block_size=block_size) as scanner:
+            assert list(scanner.select(*FIELDS)) == expected
+        with FeedbackScanner(str(path), block_size=block_size) as scanner:
+            assert [tuple(row.get(k) for k in FIELDS) for row in scanner] == expected
+        with FeedbackScanner(str(path), block_size=block_size) as scanner:
+            # Unknown columns come back empty
+            assert list(scanner.select('rating', 'missing')) == [(row[2], '') for row in expected]
+
+
+def test_scanner_missing_and_header_only_files(tmp_path):
+    with FeedbackScanner(str(tmp_path / 'absent.csv')) as scanner:
+        assert list(scanner) == []
+    path = tmp_path / 'empty.csv'
+    _write(path, [], '\r\n')
+    with FeedbackScanner(str(path)) as scanner:
+        assert list(scanner.select(*FIELDS)) == []
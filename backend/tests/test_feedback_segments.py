@@ -0,0 +1,129 @@
+import csv
+import os
+
+from app import feedback_segments
+from app.feedback_segments import (
+    ARCHIVE_SUFFIX,
+    SEALED_SUFFIX,
+    archive_pending_segments,
+    archive_segment,
+    list_segments,
+    scan_feedback,
+    seal_segment,
+    segment_metadata,
+)
+
+FIELDS = ['id', 'username', 'rating', 'message', 'timestamp']
+
+
+def _append(path, rows):
+    new = not os.path.exists(path)
+    with open(path, mode='a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def _rows(day, count, start=0):
+    return [
+        {
+            'id': f'{day}-{i}',
+            'username': 'alice',
+            'rating': i % 5 + 1,
+            'message': f'day {day}, "row" {i}\nsecond line',
+            'timestamp': f'2024-01-{day:02d}T12:00:{i:02d}',
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def _segments(tmp_path):
+    active = str(tmp_path / 'feedback.csv')
+    segment_dir = str(tmp_path / 'segments')
+    return active, segment_dir
+
+
+def test_seal_archive_round_trip(tmp_path):
+    active, segment_dir = _segments(tmp_path)
+    written = []
+    for day in (1, 2, 3):
+        rows = _rows(day, 20)
+        _append(active, rows)
+        written.extend(rows)
+        sealed = seal_segment(active, segment_dir)
+        assert not os.path.exists(active)
+        if day < 3:
+            archive = archive_segment(sealed, FIELDS)
+            assert not os.path.exists(sealed)
+            meta = segment_metadata(archive)
+            assert meta['rows'] == 20
+            assert meta['min_timestamp'] == rows[0]['timestamp']
+            assert meta['max_timestamp'] == rows[-1]['timestamp']
+    # The last segment stays a sealed CSV, as if the archiver had not run yet
+    today = _rows(4, 5)
+    _append(active, today)
+    written.extend(today)
+
+    paths = list_segments(segment_dir)
+    assert [p.endswith(ARCHIVE_SUFFIX) for p in paths] == [True, True, False]
+    expected = [(r['id'], r['username'], r['rating'], r['message'], r['timestamp']) for r in written]
+    assert list(scan_feedback(segment_dir, active, FIELDS)) == expected
+
+    # Converting the pending CSV does not change what a scan returns
+    assert len(archive_pending_segments(segment_dir, FIELDS)) == 1
+    assert all(p.endswith(ARCHIVE_SUFFIX) for p in list_segments(segment_dir))
+    assert list(scan_feedback(segment_dir, active, FIELDS)) == expected
+
+
+def test_since_until_skips_archives_out_of_range(tmp_path, monkeypatch):
+    active, segment_dir = _segments(tmp_path)
+    for day in (1, 2, 3):
+        _append(active, _rows(day, 10))
+        archive_segment(seal_segment(active, segment_dir), FIELDS)
+    _append(active, _rows(4, 10))
+
+    read = []
+    original = feedback_segments.read_columns
+
+    def recording_read_columns(archive, names):
+        read.append(os.path.basename(archive))
+        return original(archive, names)
+
+    monkeypatch.setattr(feedback_segments, 'read_columns', recording_read_columns)
+    result = list(scan_feedback(
+        segment_dir, active, ['id', 'rating'],
+        since='2024-01-02T12:00:05', until='2024-01-02T23:59:59',
+    ))
+    assert result == [(f'2-{i}', i % 5 + 1) for i in range(5, 10)]
+    # Only the day-2 archive overlaps the range
+    assert len(read) == 1
+    assert read[0] == os.path.basename(list_segments(segment_dir)[1])
+
+
+def test_scan_falls_back_to_archive_when_sealed_csv_vanishes(tmp_path, monkeypatch):
+    active, segment_dir = _segments(tmp_path)
+    _append(active, _rows(1, 3))
+    sealed = seal_segment(active, segment_dir)
+    listed = list_segments(segment_dir)
+    assert listed == [sealed]
+    # The background archiver converts the CSV between listing and reading
+    archive_segment(sealed, FIELDS)
+    monkeypatch.setattr(feedback_segments, 'list_segments', lambda _: listed)
+    assert [row[0] for row in scan_feedback(segment_dir, active, ['id'])] == ['1-0', '1-1', '1-2']
+    assert sealed.endswith(SEALED_SUFFIX)
+
+
+def test_scan_keeps_active_segment_sealed_mid_scan(tmp_path):
+    active, segment_dir = _segments(tmp_path)
+    _append(active, _rows(1, 1))
+    archive_segment(seal_segment(active, segment_dir), FIELDS)
+    _append(active, _rows(2, 1))
+
+    scan = scan_feedback(segment_dir, active, ['id'])
+    assert next(scan) == ('1-0',)
+    # Another request rotates the active segment and appends to a new one
+    seal_segment(active, segment_dir)
+    _append(active, _rows(3, 1))
+    assert list(scan) == [('2-0',)]
+    assert [row[0] for row in scan_feedback(segment_dir, active, ['id'])] == ['1-0', '2-0', '3-0']